@@ -1,6 +1,32 @@
+import asyncio
+import logging
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
 import pyvisa
 
+log = logging.getLogger(__name__)
+
+_RM = None
+
+
+def _get_rm():
+    """
+    Return the process wide pyvisa.ResourceManager, creating it on first use.
+
+    Args:
+        None
+
+    Return: pyvisa.ResourceManager instance shared by all RTM3004 objects.
+    """
+    global _RM
+    if _RM is None:
+        _RM = pyvisa.ResourceManager()
+    return _RM
+
 
 class RTM3004:
     """
@@ -16,52 +42,585 @@ class RTM3004:
         wavevolt: Float of the amplitude for the waveform generator output.
     """
 
-    def __init__(self, device_ip):
+    # Command headers of the waveform generator setters used in sweeps.
+    _CMD_VOLT = "WGEN:VOLT"
+    _CMD_VOLT_OFFS = "WGEN:VOLT:OFFS"
+    _CMD_FREQ = "WGEN:FREQ"
+    _CMD_NOIS = "WGEN:NOIS:ABS"
+    _CMD_BURS_ITIM = "WGEN:BURS:ITIM"
+
+    # Maximum number of queued messages joined into one compound message, see "enableQueuedWrites".
+    _TX_CHUNK = 32
+
+    # Command headers of the frequency sweep and spectrum setters.
+    # The spectrum center, span and start are adjusted together by the instrument, so they are written without the settings cache.
+    _CMD_SWE_FST = "WGEN:SWE:FST"
+    _CMD_SWE_FEND = "WGEN:SWE:FEND"
+    _CMD_SWE_TIME = "WGEN:SWE:TIME"
+    _CMD_SPEC_CENT = "SPEC:FREQ:CENT"
+    _CMD_SPEC_SPAN = "SPEC:FREQ:SPAN"
+    _CMD_SPEC_STAR = "SPEC:FREQ:STAR"
+    # Measurement result queries for indices 1..8, and the indices of "setSimpleMeasurements" in channel order.
+    _Q_MEAS_RES = tuple(f"MEAS{i}:RES?" for i in range(1, 9))
+    _Q_SIMPLE_RES = tuple(f"MEAS{i}:RES?" for i in (1, 5, 2, 6, 3, 7))
+    _Q_SIMPLE_AVG = tuple(f"MEAS{i}:RES:AVG?" for i in (1, 5, 2, 6, 3, 7))
+    _Q_SIMPLE_STD = tuple(f"MEAS{i}:RES:STDD?" for i in (1, 5, 2, 6, 3, 7))
+
+    def __init__(self, device_ip, open_timeout=2000, timeout=60000):
         """
         Intialization of object.
 
         Args:
             device_ip: IP address of the oscilloscope on the network. \\
                 Requires that the RTM3004 is connected to the network, and recommended to have either a static IP or hostname
+            open_timeout: Int of the time in milliseconds to wait for the connection to open, so an unreachable device fails fast.
+            timeout: Int of the time in milliseconds for each read or write to complete once connected. \\
+                Also bounds the slowest synchronized command, e.g. "*RST" in "reset".
 
         Return: RTM3004 instrument class instance/object.
         """
-        print("Initializing RTM3004 oscilloscope...")
-        ResourceManager = pyvisa.ResourceManager()
-        self.instrument = ResourceManager.open_resource(device_ip)
-        self.instrument.timeout = 60 * 1000
+        log.info("Initializing RTM3004 oscilloscope at %s", device_ip)
+        ResourceManager = _get_rm()
+        try:
+            self.instrument = ResourceManager.open_resource(device_ip, open_timeout=open_timeout)
+        except pyvisa.errors.VisaIOError as err:
+            raise ConnectionError(
+                f"Could not open RTM3004 at {device_ip} within {open_timeout} ms: {err.description}"
+            ) from err
+        self.instrument.timeout = timeout
+        self.instrument.read_termination = "\n"
+        self.instrument.write_termination = "\n"
+        self.instrument.send_end = True
+        self.instrument.chunk_size = 1024 * 1024
+        self.instrument.query_delay = 0.0
+        self.instrument.write("*ESE 1;*SRE 32")
         self.name = device_ip
         self.connected = True
         self.SimpleMeasurementStatus = False
         self.SimpleSetupStatus = False
         self.wavevolt = 0
+        self._batch = None
+        self._batch_depth = 0
+        self._batch_sync = False
+        self._cache = {}
+        self._saved_setup = None
+        self._saved_cache = {}
+        self._in_setup = False
+        self._srq = True
+        self._compound_queries = {}
+        self._lock = threading.RLock()
+        self._txq = None
+        self._tx_lock = threading.Lock()
+        self._tx_event = threading.Event()
+        self._tx_thread = None
+        self._tx_error = None
+        self._tx_hold = 0
         self.reset()
-        print("... done.\n")
+        log.info("RTM3004 oscilloscope at %s initialized", device_ip)
 
-    def write(self, message):
+    def write(self, message, pace=0.0, sync=False):
         """
         Wrapper for writing message to the instrument via PyVisa.
 
         Args:
-            message: String of the message being sent. Accepts the R&S RTM3004 protocol.
+            message: String or bytes of the message being sent, without termination. Accepts the R&S RTM3004 protocol.
+            pace: Float of the time to sleep after the write in seconds. Only needed for the rare slow command, defaults to no pacing.
+            sync: Boolean which appends "*OPC?" to the message and reads its reply, blocking until the instrument has executed it. \\
+                Inside a batch the synchronization is deferred to the end of the batch. A synchronized or paced write is never queued, see "enableQueuedWrites".
+
+        Return: None
+        """
+        if isinstance(message, str):
+            message = message.encode("ascii")
+        if not self._in_setup:
+            # The configuration stored by simpleSetup no longer matches the instrument.
+            self._saved_setup = None
+        if self._cache:
+            self._forget_written(message)
+        if self._batch is not None:
+            self._batch.append(message)
+            self._batch_sync = self._batch_sync or sync
+            return
+        if not sync and not pace and self._enqueue(message):
+            return
+        with self._lock:
+            self.flush()
+            if sync:
+                self.instrument.write_raw(self._join_commands([message, b"*OPC?"]) + b"\n")
+                self.instrument.read()
+            else:
+                self.instrument.write_raw(message + b"\n")
+        if pace:
+            time.sleep(pace)
+        return
+
+    def ask(self, message, no_cache=False):
+        """
+        Query the instrument using the PyVisa connection.
+        Queries matching a setting previously written through this object are answered from the local cache without a round trip, \\
+        with the value as it was written.
+
+        Args:
+            message: String of the query. Accepts the R&S RTM3004 protocol.
+            no_cache: Boolean which forces the query to be sent to the instrument even if a cached value exists.
+
+        Return: String of returned message, without trailing termination or whitespace.
+        """
+        if not no_cache and message in self._cache:
+            return self._cache[message]
+        with self._lock:
+            if self._batch:
+                self._send_batch()
+            self.flush()
+            response = self.instrument.query(message)
+        return response.rstrip()
+
+    async def aask(self, message, no_cache=False):
+        """
+        Awaitable version of "ask". The query runs in a worker thread so the event loop keeps running while the instrument responds. \\
+        Independent queries can be awaited together with asyncio.gather, they are still serialized on the one VISA session.
+
+        Args:
+            message: String of the query. Accepts the R&S RTM3004 protocol.
+            no_cache: Boolean which forces the query to be sent to the instrument even if a cached value exists.
+
+        Return: String of returned message, without trailing termination or whitespace.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ask, message, no_cache)
+
+    async def awrite(self, message, pace=0.0):
+        """
+        Awaitable version of "write". The write runs in a worker thread so the event loop keeps running during the transfer.
+
+        Args:
+            message: String or bytes of the message being sent, without termination. Accepts the R&S RTM3004 protocol.
+            pace: Float of the time to sleep after the write in seconds.
 
         Return: None
         """
-        self.instrument.write(message)
-        time.sleep(0.01)
-        return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.write, message, pace)
 
-    def ask(self, message):
+    def beginBatch(self):
         """
-        Query the instrument using the PyVisa connection.
+        Start buffering written messages instead of sending them. The buffered messages are sent as a single compound message by "endBatch". \\
+        Calls can be nested, only the outermost "endBatch" sends the message.
+
+        Args:
+            None
+
+        Return: None
+        """
+        self._batch_depth += 1
+        if self._batch is None:
+            self._batch = []
+
+    def endBatch(self, sync=False):
+        """
+        Stop buffering written messages and send everything buffered since "beginBatch" as one compound message.
+
+        Args:
+            sync: Boolean which appends "*OPC?" to the message and blocks until the instrument has executed all of it.
+
+        Return: None
+        """
+        if not self._batch_depth:
+            return
+        self._batch_sync = self._batch_sync or sync
+        self._batch_depth -= 1
+        if self._batch_depth:
+            return
+        try:
+            if self._batch:
+                self._send_batch(sync=self._batch_sync)
+        finally:
+            # Leave batching even if the send failed, so later writes are not buffered and never sent.
+            self._batch = None
+            self._batch_sync = False
+
+    @contextmanager
+    def batch(self, sync=False):
+        """
+        Context manager wrapping "beginBatch" and "endBatch", so that all writes made inside the block reach the instrument in one transaction. \\
+        e.g. "with scope.batch(): scope.simpleSetup()" sends the whole setup as one message without changing the setters.
+
+        Args:
+            sync: Boolean which blocks on exit until the instrument has executed the whole transaction, see "endBatch".
+
+        Return: None
+        """
+        self.beginBatch()
+        try:
+            yield self
+        finally:
+            self.endBatch(sync=sync)
+
+    def _send_batch(self, sync=False):
+        """
+        Send the buffered messages as one compound message, see "_join_commands".
+
+        Args:
+            sync: Boolean which appends "*OPC?" to the message and reads its reply, as the single synchronization point.
+
+        Return: None
+        """
+        if sync:
+            self._batch.append(b"*OPC?")
+        message = self._join_commands(self._batch)
+        self._batch = []
+        if not sync and self._enqueue(message):
+            return
+        with self._lock:
+            self.flush()
+            try:
+                self.instrument.write_raw(message + b"\n")
+                if sync:
+                    self.instrument.read()
+            except Exception:
+                # The batched settings were cached when written, not when sent.
+                self.invalidateCache()
+                raise
+
+    def _batch_write(self, *cmds, sync=False):
+        """
+        Write several messages to the instrument as one compound message.
+
+        Args:
+            cmds: Strings or bytes of the messages being sent. Accepts the R&S RTM3004 protocol.
+            sync: Boolean which blocks until the instrument has executed the messages, see "endBatch".
+
+        Return: None
+        """
+        with self.batch(sync=sync):
+            for cmd in cmds:
+                self.write(cmd)
+
+    def enableQueuedWrites(self):
+        """
+        Queue written messages and send them from a background thread, so write-only sequences return without waiting on the connection. \\
+        Queries, "wait" and synchronized writes send the queue first, so they always see the effect of every earlier write. \\
+        NOTE: call "disableQueuedWrites" or "flush" before exiting, as the background thread does not keep the interpreter alive.
+
+        Args:
+            None
+
+        Return: None
+        """
+        if self._tx_thread is not None:
+            return
+        self._txq = deque()
+        self._tx_error = None
+        self._tx_thread = threading.Thread(target=self._tx_loop, name=f"RTM3004 {self.name}", daemon=True)
+        self._tx_thread.start()
+
+    def disableQueuedWrites(self):
+        """
+        Send the remaining queued messages, stop the background thread and go back to sending each write directly. \\
+        If the remaining messages cannot be sent the error is raised and they are dropped, writing directly regardless.
+
+        Args:
+            None
+
+        Return: None
+        """
+        thread, self._tx_thread = self._tx_thread, None
+        if thread is None:
+            return
+        self._tx_event.set()
+        thread.join()
+        with self._lock:
+            with self._tx_lock:
+                # Later writes are sent directly, after the rest of the queue as they wait for the instrument lock.
+                txq, self._txq = self._txq, None
+            error, self._tx_error = self._tx_error, None
+            self._drain_queue(txq)
+            if error is not None:
+                raise error
+
+    def flush(self):
+        """
+        Send every queued message now, see "enableQueuedWrites". \\
+        Then raises the error of a failed background send, if any, so it is not lost.
+
+        Args:
+            None
+
+        Return: None
+        """
+        with self._lock:
+            error, self._tx_error = self._tx_error, None
+            self._drain_queue(self._txq)
+            if error is not None:
+                raise error
+
+    @contextmanager
+    def sync(self):
+        """
+        Context manager which sends the queue and then sends every write made inside the block directly, as if queued writes were disabled.
+
+        Args:
+            None
+
+        Return: None
+        """
+        self._tx_hold += 1
+        try:
+            self.flush()
+            yield self
+        finally:
+            self._tx_hold -= 1
+
+    def _enqueue(self, message):
+        """
+        Append a message to the write queue, if queued writes are enabled and not held by "sync".
+
+        Args:
+            message: Bytes of the message being sent.
+
+        Return: Boolean of whether the message was queued.
+        """
+        with self._tx_lock:
+            if self._txq is None or self._tx_hold:
+                return False
+            self._txq.append(message)
+        self._tx_event.set()
+        return True
+
+    def _drain_queue(self, txq):
+        """
+        Send the queued messages in compound messages of up to "_TX_CHUNK" messages each, see "_join_commands". \\
+        Messages that could not be sent stay at the front of the queue.
+
+        Args:
+            txq: The deque of the queued messages, or None.
+
+        Return: None
+        """
+        with self._lock:
+            while txq:
+                cmds = [txq.popleft() for _ in range(min(len(txq), self._TX_CHUNK))]
+                try:
+                    self.instrument.write_raw(self._join_commands(cmds) + b"\n")
+                except Exception:
+                    txq.extendleft(reversed(cmds))
+                    # The queued settings were cached when written, not when sent.
+                    self.invalidateCache()
+                    raise
+
+    def _tx_loop(self):
+        """
+        Body of the background thread started by "enableQueuedWrites", sending the queue whenever a message is added.
+
+        Args:
+            None
+
+        Return: None
+        """
+        event = self._tx_event
+        while self._tx_thread is not None:
+            event.wait()
+            event.clear()
+            try:
+                self._drain_queue(self._txq)
+            except Exception as err:
+                log.error("Queued write to RTM3004 at %s failed: %s", self.name, err)
+                self._tx_error = err
+
+    def _batch_ask_floats(self, *queries):
+        """
+        Send several numeric queries as one compound message and parse the single response in one pass.
+
+        Args:
+            queries: Strings of the queries. Accepts the R&S RTM3004 protocol.
+
+        Return: numpy array of the responses, in the order of the queries.
+        """
+        values = np.fromstring(self.ask(self._join_queries(queries)), sep=";")
+        self._check_batch_response(queries, values)
+        return values
+
+    def _join_queries(self, queries):
+        """
+        Join queries into one compound query, see "_join_commands". The result is kept, so repeated polls reuse the same string.
+
+        Args:
+            queries: Tuple of strings of the queries.
+
+        Return: String of the compound query.
+        """
+        message = self._compound_queries.get(queries)
+        if message is None:
+            message = self._join_commands([q.encode("ascii") for q in queries]).decode("ascii")
+            self._compound_queries[queries] = message
+        return message
+
+    def _ask_float(self, message):
+        """
+        Query a single numeric value and parse it once.
 
         Args:
             message: String of the query. Accepts the R&S RTM3004 protocol.
 
-        Return: String of returned message.
+        Return: Float of the response.
+        """
+        return float(self.ask(message))
+
+    @staticmethod
+    def _check_batch_response(queries, values):
+        """
+        Make sure a compound query returned one value per query, so values are never silently shifted or dropped.
+
+        Args:
+            queries: Strings of the queries sent.
+            values: Sequence of the parsed responses.
+
+        Return: None
+        """
+        if len(values) != len(queries):
+            raise ValueError(
+                f"Expected {len(queries)} responses to {';'.join(queries)}, got {len(values)}."
+            )
+
+    def _ask_block(self, message, datatype="f"):
         """
-        response = self.instrument.query(message)
-        return response
+        Query the instrument for a binary definite-length block and decode it without any ASCII parsing.
+
+        Args:
+            message: String of the query. Accepts the R&S RTM3004 protocol.
+            datatype: String of the struct format of one value, e.g. "f" for REAL,32 or "B" for UINT,8.
+
+        Return: numpy array of the values in the block.
+        """
+        with self._lock:
+            if self._batch:
+                self._send_batch()
+            self.flush()
+            return self.instrument.query_binary_values(
+                message, datatype=datatype, is_big_endian=False, container=np.array
+            )
+
+    @staticmethod
+    def _join_commands(cmds):
+        """
+        Join messages into one SCPI compound message. A message in the same subsystem as the previous one is sent relative to it \\
+        (e.g. "WGEN:BURS:NCYC 10;ITIM 1.00e-01"), common commands follow a plain ";" and any other message is sent from the root with ";:".
+
+        Args:
+            cmds: List of bytes of the messages.
+
+        Return: Bytes of the compound message.
+        """
+        joined = []
+        path = None
+        for cmd in cmds:
+            cmd = cmd.lstrip(b":")
+            header = cmd.split(b" ", 1)[0]
+            node = header.rpartition(b":")[0]
+            if not joined:
+                joined.append(cmd)
+            elif header.startswith(b"*"):
+                joined.append(b";" + cmd)
+            elif node and node == path:
+                joined.append(b";" + cmd[len(node) + 1 :])
+            else:
+                joined.append(b";:" + cmd)
+            # Common commands and messages that are compound themselves leave the path unknown.
+            path = None if header.startswith(b"*") or b";" in cmd else node
+        return b"".join(joined)
+
+    def _write_cached(self, header, value):
+        """
+        Write a setting and remember the value, so that the matching query can be answered by "ask" without a round trip.
+        The write is skipped if the same value was already written.
+
+        Args:
+            header: String of the command header, e.g. "CHAN1:SCAL".
+            value: String of the formatted value being set.
+
+        Return: None
+        """
+        query = f"{header}?"
+        if self._cache.get(query) == value:
+            return
+        self.write(f"{header} {value}")
+        self._cache[query] = value
+
+    def _write_ask(self, header, value):
+        """
+        Write a setting and read back the value the instrument committed in the same message, e.g. after it is rounded to a valid step. \\
+        Like "_write_cached", the value as written is cached and only the query is sent if that value is already set.
+
+        Args:
+            header: String of the command header, e.g. "CHAN1:SCAL".
+            value: String of the formatted value being set.
+
+        Return: String of the committed value.
+        """
+        query = f"{header}?"
+        if self._cache.get(query) == value:
+            return self.ask(query, no_cache=True)
+        message = self._join_commands([f"{header} {value}".encode("ascii"), query.encode("ascii")])
+        if not self._in_setup:
+            self._saved_setup = None
+        committed = self.ask(message.decode("ascii"), no_cache=True)
+        self._cache[query] = value
+        return committed
+
+    def _forget_written(self, message):
+        """
+        Drop the cached values of the settings a message writes, so a later query reads them from the instrument. \\
+        A "*RST" or "*RCL" in the message drops the whole cache, as the instrument state is replaced. \\
+        Headers of a compound message which do not start with ":" are resolved relative to the previous one, e.g. "CHAN1:SCAL 1;POS 2" writes "CHAN1:POS".
+
+        Args:
+            message: Bytes of the message being sent.
+
+        Return: None
+        """
+        path = ""
+        for part in message.split(b";"):
+            header = part.strip().split(b" ", 1)[0].decode("ascii")
+            if header.startswith("*"):
+                if header in ("*RST", "*RCL"):
+                    self._cache.clear()
+                    return
+                # Common commands leave the current path unchanged.
+                continue
+            if header.startswith(":"):
+                header = header[1:]
+            elif path:
+                header = f"{path}:{header}"
+            path = header.rpartition(":")[0]
+            self._cache.pop(f"{header}?", None)
+
+    def invalidateCache(self):
+        """
+        Forget all cached settings, so subsequent queries are sent to the instrument. \\
+            Should be called if the oscilloscope settings were changed outside of this object (e.g. on the front panel).
+
+        Args:
+            None
+
+        Return: None
+        """
+        self._cache.clear()
+
+    @staticmethod
+    def closeResourceManager():
+        """
+        Close the pyvisa.ResourceManager shared by all RTM3004 objects, e.g. on teardown. \\
+        Sessions opened through it are closed as well, the next RTM3004 created opens a new one.
+
+        Args:
+            None
+
+        Return: None
+        """
+        global _RM
+        if _RM is not None:
+            _RM.close()
+            _RM = None
 
     def identify(self):
         """
@@ -83,22 +642,73 @@ class RTM3004:
 
         Return: None
         """
-        self.write("*RST")
+        self.invalidateCache()
+        self.write("*RST", sync=True)
 
-    def wait(self, dt=0.5):
+    def wait(self, dt=0.5, timeout=60):
         """
-        Sleep loop until the oscilloscope returns a ready status.
+        Block until the oscilloscope returns a ready status.
+        Waits on the service request raised by "*OPC", falling back to polling "*OPC?" if the VISA backend does not deliver service requests.
 
         Args:
-            dt: Float of the time to wait between oscilloscope queries.
+            dt: Float of the time to wait between oscilloscope queries when polling.
+            timeout: Float of the maximum time to wait in seconds. Raises TimeoutError if the instrument is still busy after it, \\
+                after cancelling the pending "*OPC" with "*CLS".
 
         Return: None
         """
-        while True:
-            done = self.ask("*OPC?")
-            if done == "1\n":
-                break
-            time.sleep(dt)
+        with self._lock:
+            if self._batch:
+                self._send_batch()
+            self.flush()
+            if self._srq:
+                event = pyvisa.constants.EventType.service_request
+                mechanism = pyvisa.constants.EventMechanism.queue
+                try:
+                    self.instrument.enable_event(event, mechanism)
+                except (pyvisa.errors.VisaIOError, NotImplementedError):
+                    self._srq = False
+                else:
+                    try:
+                        self.instrument.write("*OPC")
+                        self.instrument.wait_on_event(event, int(timeout * 1000))
+                    except pyvisa.errors.VisaIOError as err:
+                        if err.error_code == pyvisa.constants.StatusCode.error_timeout:
+                            self._wait_timed_out(timeout, err)
+                        # Any other error means the session does not deliver the service request.
+                        self._srq = False
+                    finally:
+                        self.instrument.disable_event(event, mechanism)
+                    # Serial poll to clear the request, then clear the operation complete bit for the next wait.
+                    # pyvisa only offers wait_for_srq on GPIB, wait_on_event covers the LAN and USB sessions too.
+                    if self._srq:
+                        self.instrument.read_stb()
+                    self.instrument.query("*ESR?")
+                    if self._srq:
+                        return
+            write_raw = self.instrument.write_raw
+            read_bytes = self.instrument.read_bytes
+            deadline = time.monotonic() + timeout
+            while True:
+                write_raw(b"*OPC?\n")
+                if read_bytes(2) == b"1\n":
+                    break
+                if time.monotonic() + dt > deadline:
+                    self._wait_timed_out(timeout)
+                time.sleep(dt)
+
+    def _wait_timed_out(self, timeout, err=None):
+        """
+        Cancel the pending "*OPC" of "wait", so it cannot raise a late service request, and report the timeout.
+
+        Args:
+            timeout: Float of the time waited in seconds.
+            err: The pyvisa.errors.VisaIOError which reported the timeout, if any.
+
+        Return: None, always raises TimeoutError.
+        """
+        self.instrument.write("*CLS")
+        raise TimeoutError(f"RTM3004 at {self.name} still busy after {timeout} s") from err
 
     def getTermination(self, channel=1):
         """
@@ -109,7 +719,7 @@ class RTM3004:
 
         Return: String of impedance.
         """
-        return self.ask("PROB%i:SET:IMP?" % (channel))
+        return self.ask(f"PROB{channel}:SET:IMP?")
 
     def setBandwidth(self, channel=1, bw="FULL"):
         """
@@ -121,7 +731,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:BAND %s" % (channel, bw))
+        self._write_cached(f"CHAN{channel}:BAND", bw)
 
     def getBandwidth(self, channel=1):
         """
@@ -132,7 +742,7 @@ class RTM3004:
 
         Return: String of bandwidth setting.
         """
-        return self.ask("CHAN%i:BAND?" % (channel))
+        return self.ask(f"CHAN{channel}:BAND?")
 
     ######################################################
     # HORIZONTAL
@@ -147,7 +757,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TIM:SCAL %.2e" % (div))
+        self._write_cached("TIM:SCAL", f"{div:.2e}")
 
     def getHorizontalScale(self):
         """
@@ -169,7 +779,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TIM:POS %.6f" % (t))
+        self._write_cached("TIM:POS", f"{t:.6f}")
 
     def getHorizontalPosition(self):
         """
@@ -196,7 +806,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:SCAL %.3f" % (channel, div))
+        self._write_cached(f"CHAN{channel}:SCAL", f"{div:.3f}")
 
     def getVerticalScale(self, channel=1):
         """
@@ -207,7 +817,7 @@ class RTM3004:
 
         Return: String of the channel vertical scaling of the display.
         """
-        return self.ask("CHAN%i:SCAL?" % (channel))
+        return self.ask(f"CHAN{channel}:SCAL?")
 
     def setVerticalPosition(self, channel=1, div=0):
         """
@@ -219,7 +829,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:POS %.2f" % (channel, div))
+        self._write_cached(f"CHAN{channel}:POS", f"{div:.2f}")
 
     def getVerticalPosition(self, channel=1):
         """
@@ -230,7 +840,7 @@ class RTM3004:
 
         Return: String of the channel vertical position of the display.
         """
-        return self.ask("CHAN%i:POS?" % (channel))
+        return self.ask(f"CHAN{channel}:POS?")
 
     def setVerticalOffset(self, channel=1, offset=0):
         """
@@ -242,7 +852,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:OFFS %.2f" % (channel, offset))
+        self._write_cached(f"CHAN{channel}:OFFS", f"{offset:.2f}")
 
     def getVerticalOffset(self, channel=1):
         """
@@ -253,21 +863,27 @@ class RTM3004:
 
         Return: String of the channel vertical offset of the display.
         """
-        return self.ask("CHAN%i:OFFS?" % (channel))
+        return self.ask(f"CHAN{channel}:OFFS?")
 
     def checkClipping(self, index=1):
         """
-        Check if a particular index is clipping above the screen limits. Index is set as a measurement and should be set to measuring the Vpp.
+        Check if a particular index is clipping above the screen limits. Index is set as a measurement and should be set to measuring the Vpp. \\
+        The query waits on the instrument side ("*WAI") for preceding commands to finish, but not for a new acquisition, \\
+        so after changing a scale the measurement has to be refreshed first, see "fixClipping".
 
         Args:
             index: Int of the index.
 
         Return: Boolean of whether the index is clipping.
         """
-        status = self.getMeasurementResult(index) == "9.91E+37\n"
-        return status
+        try:
+            value = self._ask_float(f"*WAI;MEAS{index}:RES?")
+        except ValueError:
+            return True
+        # The instrument reports an invalid measurement as 9.91E+37.
+        return value > 1e37
 
-    def fixClipping(self, index=1, channel=1, scale=5e-3):
+    def fixClipping(self, index=1, channel=1, scale=5e-3, vpp_index=None, maxiter=50, settle="SING"):
         """
         Custom loop that attempts to fix the clipping channel by verifying through a particular index.
 
@@ -275,21 +891,45 @@ class RTM3004:
             index: Int of the index.
             channel: Int of channel to be queried in range [1..4].
             scale: Float starting vertical scale of display. Loop internally increases scale by 25% each time until clipping is resolved.
-
-        Return: Float of final vertical scale that resolved clipping.
-        """
-        self.setVerticalScale(channel=channel, div=scale)
-        time.sleep(2)
+            vpp_index: Int of an index measuring the peak to peak voltage of the same signal without clipping (e.g. on another channel or math waveform). \\
+                When set, the scale jumps directly to fit that voltage on screen instead of ramping by 25%.
+            maxiter: Int of the maximum number of scale increases, after which the loop gives up with a warning.
+            settle: "SING" to take one new acquisition ("SING;*OPC?") after each scale change and measure on it, resuming a running acquisition at the end. \\
+                Requires the trigger to fire, e.g. in "NORM" trigger mode. Otherwise a Float of the time in seconds a running acquisition is given to refresh the measurement, \\
+                restarting the averages with "ACQ:AVER:RES" first in "AVER" or "ENV" acquisition, so old waveforms do not keep the clipping.
+
+        Return: Float of final vertical scale that resolved clipping, as committed by the instrument.
+        """
+        check = self.checkClipping
+        header = f"CHAN{channel}:SCAL"
+        averaged = self.getAcquisitionType() in ("AVER", "ENV")
+        running = settle == "SING" and self.ask("ACQ:STAT?") == "RUN"
+        # Every scale write reads back the committed value in the same message, so no separate query is needed at the end.
         inscale = scale
-        while self.checkClipping(index=index):
-            inscale = self.getVerticalScale(channel=channel)
-            inscale = 1.25 * float(inscale[:-1])
-            self.setVerticalScale(channel=channel, div=inscale)
-            time.sleep(3)
-            self.wait(10)
-        return inscale
-
-    def fixMathClipping(self, index=1, channel=1, scale=5e-3):
+        committed = self._write_ask(header, f"{inscale:.3f}")
+        self._settle(settle, averaged)
+        steps = 0
+        while check(index=index):
+            if steps == maxiter:
+                log.warning("Channel %i still clipping after %i scale steps", channel, maxiter)
+                break
+            steps += 1
+            inscale *= 1.25
+            if vpp_index is not None:
+                try:
+                    vpp = self.getMeasurementResult(vpp_index)
+                except ValueError:
+                    vpp = 9.91e37
+                if vpp < 1e37:
+                    # 10 vertical divisions on screen, with 10% headroom.
+                    inscale = max(1.1 * vpp / 10, inscale)
+            committed = self._write_ask(header, f"{inscale:.3f}")
+            self._settle(settle, averaged)
+        if running:
+            self.startAcquisition()
+        return float(committed)
+
+    def fixMathClipping(self, index=1, channel=1, scale=5e-3, maxiter=50, settle="SING"):
         """
         Custom loop that attempts to fix the clipping Math channel by verifying through a particular index.
 
@@ -297,49 +937,54 @@ class RTM3004:
             index: Int of the index.
             channel: Int of channel to be queried in range [1..4].
             scale: Float starting vertical scale of display. Loop internally increases scale by 25% each time until clipping is resolved.
+            maxiter: Int of the maximum number of scale increases, after which the loop gives up with a warning.
+            settle: "SING" to take one new acquisition ("SING;*OPC?") after each scale change and measure on it, resuming a running acquisition at the end. \\
+                Requires the trigger to fire, e.g. in "NORM" trigger mode. Otherwise a Float of the time in seconds a running acquisition is given to refresh the measurement, \\
+                restarting the averages with "ACQ:AVER:RES" first in "AVER" or "ENV" acquisition, so old waveforms do not keep the clipping.
 
         Return: Float of final vertical scale that resolved clipping.
         """
-        self.setMathScale(index=channel, scale=scale)
-        time.sleep(2)
-        while self.checkClipping(index=index):
-            inscale = self.getMathScale(index=channel)
-            inscale = 1.25 * float(inscale[:-1])
-            self.setMathScale(index=channel, div=inscale)
-            time.sleep(3)
-            self.wait(10)
-
-    ######################################################
-    # ACQUISITION
-    ######################################################
+        check = self.checkClipping
+        setscale = self.setMathScale
+        averaged = self.getAcquisitionType() in ("AVER", "ENV")
+        running = settle == "SING" and self.ask("ACQ:STAT?") == "RUN"
+        inscale = scale
+        setscale(index=channel, scale=inscale)
+        self._settle(settle, averaged)
+        steps = 0
+        while check(index=index):
+            if steps == maxiter:
+                log.warning("Math %i still clipping after %i scale steps", channel, maxiter)
+                break
+            steps += 1
+            inscale *= 1.25
+            setscale(index=channel, scale=inscale)
+            self._settle(settle, averaged)
+        if running:
+            self.startAcquisition()
+        return inscale
 
-    def setAcquisitionType(self, mode="REF"):
+    def _settle(self, settle, averaged):
         """
-        Set the acquisition type of the oscilloscope.
-        REFresh takes the whole waveform.
-        AVERage takes and displays an average waveform.
-        ENVelope displays the envelope of the waveform.
+        Refresh the measurements after a setting changed, see "fixClipping".
 
         Args:
-            mode: String with options "REF", "AVER" and "ENV".
+            settle: "SING" to take one new acquisition and wait until it completes, or Float of the time to wait in seconds.
+            averaged: Boolean of whether the acquisition averages waveforms, which are then restarted first when waiting a time.
 
         Return: None
         """
-        self.write("ACQ:TYPE %s" % (mode))
-
-    def getAcquisitionType(self):
-        """
-        Get the acquisition type of the oscilloscope.
-        REFresh takes the whole waveform.
-        AVERage takes and displays an average waveform.
-        ENVelope displays the envelope of the waveform.
+        if settle == "SING":
+            self.write("SING", sync=True)
+            return
+        if averaged:
+            self.write("ACQ:AVER:RES", sync=True)
+        if settle:
+            time.sleep(settle)
 
-        Args:
-            None
-
-        Return: String of acquisition type.
-        """
-        return self.ask("ACQ:TYPE?")
+    ######################################################
+    # ACQUISITION
+    ######################################################
 
     def setAcquisitionAuto(self, mode="ON"):
         """
@@ -350,7 +995,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("ACQ:POIN:AUT %s" % (mode))
+        self.write(f"ACQ:POIN:AUT {mode}")
 
     def getAcquisitionAuto(self):
         """
@@ -368,11 +1013,12 @@ class RTM3004:
         Set number of points in a waveform to record in a segment. Options are 5k samples to 80M samples.
 
         Args:
-            points: Float ranging from 5k to 80M.
+            points: Number of samples ranging from 5k to 80M, sent as an integer (e.g. 100e3 is sent as 100000).
 
         Return: None
         """
-        self.write("ACQ:POIN:VAL %.3f" % (points))
+        # Not cached like the other settings, in automatic mode the record length follows the time scale.
+        self.write(f"ACQ:POIN:VAL {int(points)}")
 
     def getAcquisitionPoints(self):
         """
@@ -394,7 +1040,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("ACQ:MEM:MODE %s" % (mode))
+        self.write(f"ACQ:MEM:MODE {mode}")
 
     def getAcquisitionMode(self):
         """
@@ -421,7 +1067,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:%s:MODE %s" % (src, mode))
+        self._write_cached(f"TRIG:{src}:MODE", mode)
 
     def getTriggerMode(self, src="A"):
         """
@@ -432,7 +1078,7 @@ class RTM3004:
 
         Return: String of mode.
         """
-        return self.ask("TRIG:%s:MODE?" % (src))
+        return self.ask(f"TRIG:{src}:MODE?")
 
     def setTriggerType(self, src="A", mode="EDGE"):
         """
@@ -444,7 +1090,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:%s:TYPE %s" % (src, mode))
+        self._write_cached(f"TRIG:{src}:TYPE", mode)
 
     def getTriggerType(self, src="A"):
         """
@@ -455,7 +1101,7 @@ class RTM3004:
 
         Return: String of trigger type.
         """
-        return self.ask("TRIG:%s:TYPE?" % (src))
+        return self.ask(f"TRIG:{src}:TYPE?")
 
     def setTriggerSource(self, src="A", channel=1):
         """
@@ -467,7 +1113,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:%s:SOUR CH%i" % (src, channel))
+        self._write_cached(f"TRIG:{src}:SOUR", f"CH{channel}")
 
     def getTriggerSource(self, src="A"):
         """
@@ -478,7 +1124,7 @@ class RTM3004:
 
         Return: String of channel set as trigger source.
         """
-        return self.ask("TRIG:%s:SOUR?" % (src))
+        return self.ask(f"TRIG:{src}:SOUR?")
 
     def setTriggerEdgeCoupling(self, src="A", mode="DC"):
         """
@@ -490,7 +1136,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:%s:EDGE:COUP %s" % (src, mode))
+        self._write_cached(f"TRIG:{src}:EDGE:COUP", mode)
 
     def getTriggerEdgeCoupling(self, src="A"):
         """
@@ -501,7 +1147,7 @@ class RTM3004:
 
         Return: String of the mode.
         """
-        return self.ask("TRIG:%s:EDGE:COUP?" % (src))
+        return self.ask(f"TRIG:{src}:EDGE:COUP?")
 
     def setTriggerEdgeSlope(self, src="A", mode="RISE"):
         """
@@ -513,7 +1159,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:%s:EDGE:SLOP %s" % (src, mode))
+        self._write_cached(f"TRIG:{src}:EDGE:SLOP", mode)
 
     def getTriggerEdgeSlope(self, src="A"):
         """
@@ -524,7 +1170,7 @@ class RTM3004:
 
         Return: String of the edge trigger mode.
         """
-        return self.ask("TRIG:%s:EDGE:SLOP?" % (src))
+        return self.ask(f"TRIG:{src}:EDGE:SLOP?")
 
     def setTriggerEdgeLevel(self, channel=2, level=0):
         """
@@ -536,7 +1182,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:A:LEV%i:VAL %.2f" % (channel, level))
+        self._write_cached(f"TRIG:A:LEV{channel}:VAL", f"{level:.2f}")
 
     def getTriggerEdgeLevel(self, channel=2):
         """
@@ -547,7 +1193,7 @@ class RTM3004:
 
         Return: Float of trigger edge level.
         """
-        return self.ask("TRIG:A:LEV%i:VAL?" % (channel))
+        return self.ask(f"TRIG:A:LEV{channel}:VAL?")
 
     def setTriggerAutoLevel(self):
         """
@@ -559,6 +1205,9 @@ class RTM3004:
         Return: None
         """
         self.write("TRIG:A:FIND")
+        # The instrument picks new levels, drop the ones written before.
+        for query in [q for q in self._cache if q.startswith("TRIG:A:LEV")]:
+            del self._cache[query]
 
     ######################################################
     # TRIGGER B
@@ -573,7 +1222,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("TRIG:B:DEL %.2e" % (time))
+        self._write_cached("TRIG:B:DEL", f"{time:.2e}")
 
     def getTriggerBDelayTime(self):
         """
@@ -599,7 +1248,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("EXP:WAV:SOUR CH%i" % (channel))
+        self._write_cached("EXP:WAV:SOUR", f"CH{channel}")
 
     def getDataSource(self):
         """
@@ -617,11 +1266,11 @@ class RTM3004:
         Set data destination for waveform.
 
         Args:
-            dest: String pointing to the file accessible by the Oscilloscope for saving data.
+            dest: String pointing to the file accessible by the Oscilloscope for saving data, without quotes.
 
         Return: None
         """
-        self.write("EXP:WAV:NAME %s" % (dest))
+        self._write_cached("EXP:WAV:NAME", f'"{dest}"')
 
     def getDataDestination(self):
         """
@@ -645,9 +1294,39 @@ class RTM3004:
         """
         self.write("EXP:WAV:SAVE")
 
+    def captureToScope(self, index=0, folder="/USB_FRONT", ext="BIN"):
+        """
+        Save the waveform of the set data source to the oscilloscope storage under a numbered file name, instead of transferring it to the host. \\
+        Intended for sweeps where the waveforms are only needed afterwards, see "readScopeFile".
+
+        Args:
+            index: Int used to number the file, e.g. index 3 is saved as "WFM_0003".
+            folder: String of the folder accessible by the Oscilloscope for saving data.
+            ext: String of the file extension.
+
+        Return: String of the path of the saved file.
+        """
+        path = f"{folder}/WFM_{index:04d}.{ext}"
+        self.setDataDestination(path)
+        self.saveWaveformData()
+        self.wait()
+        return path
+
+    def readScopeFile(self, path):
+        """
+        Read a file from the oscilloscope storage in one binary transfer, e.g. the waveforms saved by "captureToScope".
+
+        Args:
+            path: String of the path of the file on the oscilloscope.
+
+        Return: Bytes of the file contents.
+        """
+        return self._ask_block(f'MMEM:DATA? "{path}"', datatype="B").tobytes()
+
     def setDataFormat(self, form="CSV", bitvalue=0):
         """
-        Set the data format in which the waveform data is saved.
+        Set the data format in which the waveform data is saved. \\
+        NOTE: "ASC" and "CSV" are several times larger and much slower to transfer than "REAL" or "UINT", use "readWaveform" to read a waveform to the host.
 
         Args:
             form: String which sets the data format. Options are "ASC" (ascii), "REAL" (real), "UINT" (uinteger) and "CSV" (csv).
@@ -655,7 +1334,20 @@ class RTM3004:
 
         Return: None
         """
-        self.write("FORM %s,%i" % (form, bitvalue))
+        self._write_cached("FORM", f"{form},{int(bitvalue)}")
+
+    def _set_real_format(self):
+        """
+        Select little endian REAL,32 transfers for "_ask_block". Skipped when already selected, so repeated reads cost no extra write.
+
+        Args:
+            None
+
+        Return: None
+        """
+        with self.batch():
+            self._write_cached("FORM", "REAL,32")
+            self._write_cached("FORM:BORD", "LSBF")
 
     def getDataFormat(self):
         """
@@ -668,6 +1360,27 @@ class RTM3004:
         """
         return self.ask("FORM?")
 
+    def readWaveform(self, channel=1, bits=32):
+        """
+        Read the waveform of a particular channel over the connection as binary data. \\
+        NOTE: sets the data format, which is shared with "setDataFormat".
+
+        Args:
+            channel: Int of channel to be read in range [1..4].
+            bits: Int of the transfer resolution, 32 or 8. 32 transfers IEEE 754 floats, 8 transfers unsigned bytes that are converted to volts locally with 4x less data on the wire.
+
+        Return: numpy array of the waveform in volts.
+        """
+        if bits == 32:
+            self._set_real_format()
+            return self._ask_block(f"CHAN{channel}:DATA?")
+        if bits != 8:
+            raise ValueError(f"Unsupported waveform transfer resolution {bits}, use 32 or 8 bits.")
+        self._write_cached("FORM", "UINT,8")
+        raw = self._ask_block(f"CHAN{channel}:DATA?", datatype="B")
+        yorigin, yincrement = self._batch_ask_floats(f"CHAN{channel}:DATA:YOR?", f"CHAN{channel}:DATA:YINC?")
+        return raw.astype(np.float32) * yincrement + yorigin
+
     def getWaveformSampleRate(self):
         """
         Get the waveform sample rate.
@@ -703,7 +1416,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("START")
+        self.write("RUN")
 
     def stopAcquisition(self):
         """
@@ -726,7 +1439,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS%i:MAIN %s" % (index, mode))
+        self._write_cached(f"MEAS{index}:MAIN", mode)
 
     def getMeasurement(self, index=1):
         """
@@ -737,7 +1450,7 @@ class RTM3004:
 
         Return: String that refers to the measurement tracked in that particular index.
         """
-        return self.ask("MEAS%i:MAIN?" % (index))
+        return self.ask(f"MEAS{index}:MAIN?")
 
     def toggleMeasurement(self, index=1, state="ON"):
         """
@@ -749,7 +1462,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS%i %s" % (index, state))
+        self._write_cached(f"MEAS{index}", state)
 
     def setMeasurementSource(self, index=1, channel=1):
         """
@@ -761,7 +1474,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS%i:SOUR CH%i" % (index, channel))
+        self._write_cached(f"MEAS{index}:SOUR", f"CH{channel}")
 
     def setArbitraryMeasurementSource(self, index, source):
         """
@@ -773,7 +1486,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"MEAS{index}:SOUR {source}")
+        self._write_cached(f"MEAS{index}:SOUR", source)
 
     def getMeasurementSource(self, index=1):
         """
@@ -784,7 +1497,7 @@ class RTM3004:
 
         Return: String of the measurement source.
         """
-        return self.ask("MEAS%i:SOUR?" % (index, src))
+        return self.ask(f"MEAS{index}:SOUR?")
 
     def toggleMeasurementStats(self, state="OFF"):
         """
@@ -795,7 +1508,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS:STAT %s" % (state))
+        self._write_cached("MEAS:STAT", state)
 
     def resetMeasurementStats(self, ch=1):
         """
@@ -806,7 +1519,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS%i:STAT:RES" % (ch))
+        self.write(f"MEAS{ch}:STAT:RES")
 
     def toggleAutoMeasureTScale(self, state="ON"):
         """
@@ -828,7 +1541,8 @@ class RTM3004:
 
         Return: None
         """
-        self.write("MEAS1:TIM %.3f" % (dt))
+        # Not cached like the other settings, "toggleAutoMeasureTScale" changes it on the instrument.
+        self.write(f"MEAS1:TIM {dt:.3f}")
 
     def getMeasurementResult(self, index=1):
         """
@@ -837,9 +1551,9 @@ class RTM3004:
         Args:
             index: integar for measurement result.
 
-        Return: String of measurement result.
+        Return: Float of measurement result.
         """
-        return self.ask("MEAS%i:RES?" % (index))
+        return self._ask_float(f"MEAS{index}:RES?")
 
     def getMeasurementAvg(self, index=1):
         """
@@ -848,9 +1562,9 @@ class RTM3004:
         Args:
             index: integar for measurement result.
 
-        Return: String of measurement average.
+        Return: Float of measurement average.
         """
-        return self.ask("MEAS%i:RES:AVG?" % (index))
+        return self._ask_float(f"MEAS{index}:RES:AVG?")
 
     def getMeasurementStd(self, index=1):
         """
@@ -859,9 +1573,9 @@ class RTM3004:
         Args:
             index: integar for measurement result.
 
-        Return: String of measurement standard deviation.
+        Return: Float of measurement standard deviation.
         """
-        return self.ask("MEAS%i:RES:STDD?" % (index))
+        return self._ask_float(f"MEAS{index}:RES:STDD?")
 
     ######################################################
     # ACQUISITION
@@ -876,7 +1590,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"ACQ:TYPE {aq}")
+        self._write_cached("ACQ:TYPE", aq)
 
     def getAcquisitionType(self):
         """
@@ -898,7 +1612,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"ACQ:AVER:COUN {val}")
+        self._write_cached("ACQ:AVER:COUN", f"{int(val)}")
 
     def getAverageCount(self):
         """
@@ -911,6 +1625,31 @@ class RTM3004:
         """
         return self.ask("ACQ:AVER:CURR?")
 
+    def configureAcquisition(self, aq=None, auto=None, points=None, mode=None, count=None):
+        """
+        Configure the acquisition in one compound message. Only the settings passed are written, see "configureChannel".
+
+        Args:
+            aq: String of the acquisition type, see "setAcquisitionType".
+            auto: String of "ON" or "OFF" for the automatic record length, see "setAcquisitionAuto".
+            points: Float of the number of points to record, ranging from 5k to 80M.
+            mode: String of the acquisition mode. Options are "AUT", "DMEM" or "MAN".
+            count: Int of the average count.
+
+        Return: None
+        """
+        with self.batch():
+            if aq is not None:
+                self.setAcquisitionType(aq=aq)
+            if auto is not None:
+                self.setAcquisitionAuto(mode=auto)
+            if mode is not None:
+                self.setAcquisitionMode(mode=mode)
+            if points is not None:
+                self.setAcquisitionPoints(points=points)
+            if count is not None:
+                self.setAverageCount(val=count)
+
     def setSampleMode(self, mode="SAMP"):
         """
         Set the sample mode of the acquisition.
@@ -920,7 +1659,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"CHAN:TYPE {mode}")
+        self._write_cached("CHAN:TYPE", mode)
 
     def getSampleMode(self):
         """
@@ -942,7 +1681,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"CHAN:ARIT {state}")
+        self._write_cached("CHAN:ARIT", state)
 
     ######################################################
     # CHANNEL SETUP
@@ -958,7 +1697,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:STAT %s" % (channel, status))
+        self._write_cached(f"CHAN{channel}:STAT", status)
 
     def statusChannel(self, channel=1):
         """
@@ -969,7 +1708,7 @@ class RTM3004:
 
         Return: String of the status of that channel.
         """
-        return self.ask("CHAN%i:STAT?" % (channel))
+        return self.ask(f"CHAN{channel}:STAT?")
 
     def setChanCoupling(self, channel=1, coup="DCLimit"):
         """
@@ -981,7 +1720,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("CHAN%i:COUP %s" % (channel, coup))
+        self._write_cached(f"CHAN{channel}:COUP", coup)
 
     def getChanCoupling(self, channel=1):
         """
@@ -992,7 +1731,59 @@ class RTM3004:
 
         Return: String of the currently set coupling for that particular channel.
         """
-        self.ask("CHAN%i:COUP?" % (channel))
+        self.ask(f"CHAN{channel}:COUP?")
+
+    def configureChannel(
+        self,
+        channel=1,
+        status=None,
+        coup=None,
+        bw=None,
+        scale=None,
+        position=None,
+        offset=None,
+    ):
+        """
+        Configure a particular channel in one compound message. Only the settings passed are written. \\
+        Several channels can be configured in one transaction by calling this inside "batch".
+
+        Args:
+            channel: Int in the range [1..4] which corresponds with one of the four channels.
+            status: String that sets the channel to "ON" or "OFF".
+            coup: String of the coupling. Options are "DCL" (DCLimit), "ACL" (ACLimit), "GND" and "DC".
+            bw: String of bandwidth setting, options of "FULL" or "B20".
+            scale: Float setting of one div in the vertical scale, range in [1e-3..10] in Volts.
+            position: Float setting of the vertical position in Volts per division.
+            offset: Float setting of the vertical offset in Volts.
+
+        Return: None
+        """
+        with self.batch():
+            if status is not None:
+                self.toggleChannel(channel=channel, status=status)
+            if coup is not None:
+                self.setChanCoupling(channel=channel, coup=coup)
+            if bw is not None:
+                self.setBandwidth(channel=channel, bw=bw)
+            if scale is not None:
+                self.setVerticalScale(channel=channel, div=scale)
+            if position is not None:
+                self.setVerticalPosition(channel=channel, div=position)
+            if offset is not None:
+                self.setVerticalOffset(channel=channel, offset=offset)
+
+    def configureChannels(self, channels=((1, "DCLimit"),)):
+        """
+        Switch on several channels and set their coupling in one compound message.
+
+        Args:
+            channels: Iterable of (channel, coup) pairs, with channel an Int in the range [1..4] and coup the String of the coupling, see "setChanCoupling".
+
+        Return: None
+        """
+        with self.batch():
+            for channel, coup in channels:
+                self.configureChannel(channel=channel, status="ON", coup=coup)
 
     ######################################################
     # WAVEFORM GENERATOR
@@ -1008,7 +1799,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:FUNC %s" % (fun))
+        self._write_cached("WGEN:FUNC", fun)
 
     def getWaveFunction(self):
         """
@@ -1031,7 +1822,7 @@ class RTM3004:
         Return: None
         """
         self.wavevolt = amp
-        self.write("WGEN:VOLT %.2e" % (amp))
+        self._write_cached(self._CMD_VOLT, format(amp, ".2e"))
 
     def getWaveVoltage(self):
         """
@@ -1053,7 +1844,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:VOLT:OFFS %.2e" % (offset))
+        self._write_cached(self._CMD_VOLT_OFFS, format(offset, ".2e"))
 
     def getWaveVoltOffset(self):
         """
@@ -1075,7 +1866,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:FREQ %.2e" % (freq))
+        self._write_cached(self._CMD_FREQ, format(freq, ".2e"))
 
     def getWaveVoltFrequency(self):
         """
@@ -1097,7 +1888,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:NOIS:ABS %.2e" % (noise))
+        self._write_cached(self._CMD_NOIS, format(noise, ".2e"))
 
     def getWaveNoise(self):
         """
@@ -1119,7 +1910,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:OUTP %s" % (status))
+        self._write_cached("WGEN:OUTP", status)
 
     def getWaveformStatus(self):
         """
@@ -1141,7 +1932,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:BURS %s" % (status))
+        self._write_cached("WGEN:BURS", status)
 
     def getWaveformBurst(self):
         """
@@ -1163,7 +1954,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:BURS:NCYC %i" % (cycles))
+        self._write_cached("WGEN:BURS:NCYC", f"{int(cycles)}")
 
     def getWaveformBurstCount(self):
         """
@@ -1185,7 +1976,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("WGEN:BURS:ITIM %.2e" % (time))
+        self._write_cached(self._CMD_BURS_ITIM, format(time, ".2e"))
 
     def getWaveformBurstIdle(self):
         """
@@ -1207,7 +1998,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"WGEN:SWE:FST {freq}")
+        self._write_cached(self._CMD_SWE_FST, f"{freq}")
 
     def setEndFreqSweep(self, freq=10e4):
         """
@@ -1218,7 +2009,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"WGEN:SWE:FEND {freq}")
+        self._write_cached(self._CMD_SWE_FEND, f"{freq}")
 
     def setSweepTime(self, time=1):
         """
@@ -1229,7 +2020,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"WGEN:SWE:TIME {time}")
+        self._write_cached(self._CMD_SWE_TIME, f"{time}")
 
     def setSweepType(self, style="LIN"):
         """
@@ -1240,7 +2031,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"WGEN:SWE:TYPE {style}")
+        self._write_cached("WGEN:SWE:TYPE", style)
 
     def toggleSweep(self, toggle="OFF"):
         """
@@ -1251,7 +2042,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"WGEN:SWE:ENAB {toggle}")
+        self._write_cached("WGEN:SWE:ENAB", toggle)
 
     def getWaveInfo(self):
         """
@@ -1279,10 +2070,11 @@ class RTM3004:
 
         Return: None
         """
-        self.setWaveFunction(fun)
-        self.setWaveVoltage(amp)
-        self.setWaveVoltOffset(offset)
-        self.setWaveVoltFrequency(freq)
+        with self.batch():
+            self.setWaveFunction(fun)
+            self.setWaveVoltage(amp)
+            self.setWaveVoltOffset(offset)
+            self.setWaveVoltFrequency(freq)
 
     ######################################################
     # FFT
@@ -1297,7 +2089,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("SPEC:STAT ON")
+        self._write_cached("SPEC:STAT", "ON")
 
     def disableSpec(self):
         """
@@ -1308,7 +2100,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write("SPEC:STAT OFF")
+        self._write_cached("SPEC:STAT", "OFF")
 
     def setSpecChan(self, channel=1):
         """
@@ -1319,7 +2111,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:SOUR CH{channel}")
+        self._write_cached("SPEC:SOUR", f"CH{channel}")
 
     def setSpecWindowType(self, win="HANN"):
         """
@@ -1330,7 +2122,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:FREQ:WIND:TYPE {win}")
+        self._write_cached("SPEC:FREQ:WIND:TYPE", win)
 
     def setSpecScaling(self, scale="DBM"):
         """
@@ -1341,7 +2133,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:FREQ:MAGN:SCAL {scale}")
+        self._write_cached("SPEC:FREQ:MAGN:SCAL", f"{scale}")
 
     def setSpecFreqCenter(self, center=25e3):
         """
@@ -1352,7 +2144,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:FREQ:CENT {int(center)}")
+        self.write(f"{self._CMD_SPEC_CENT} {int(center)}")
 
     def setSpecFreqSpan(self, span=50e3):
         """
@@ -1363,7 +2155,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:FREQ:SPAN {int(span)}")
+        self.write(f"{self._CMD_SPEC_SPAN} {int(span)}")
 
     def setSpecFreqStart(self, start=1e3):
         """
@@ -1374,18 +2166,49 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"SPEC:FREQ:STAR {int(start)}")
+        self.write(f"{self._CMD_SPEC_STAR} {int(start)}")
+
+    def configureSpec(self, channel=None, win=None, scale=None, center=None, span=None, start=None):
+        """
+        Configure the spectrum analysis in one compound message. Only the settings passed are written, see "configureChannel". \\
+        The center and span are written before the start frequency, so a start passed together with them takes precedence.
+
+        Args:
+            channel: Int ranging in [1..4] referring to the channel being analyzed.
+            win: String of the window setting. Options are "RECT", "HAMM", "HANN", "BLAC" and "FLAT".
+            scale: String of the y-axis scaling. Options are "LIN", "DBM", "DBV", "DBUV".
+            center: Float of the center frequency displayed in Hz.
+            span: Float of the frequency span in Hz.
+            start: Float of starting frequency in Hz.
+
+        Return: None
+        """
+        with self.batch():
+            if channel is not None:
+                self.setSpecChan(channel=channel)
+            if win is not None:
+                self.setSpecWindowType(win=win)
+            if scale is not None:
+                self.setSpecScaling(scale=scale)
+            if center is not None:
+                self.setSpecFreqCenter(center=center)
+            if span is not None:
+                self.setSpecFreqSpan(span=span)
+            if start is not None:
+                self.setSpecFreqStart(start=start)
 
     def getSpecWavData(self):
         """
-        Get the spectrum data.
+        Get the spectrum data as a binary REAL,32 transfer. \\
+        NOTE: sets the data format, which is shared with "setDataFormat".
 
         Args:
             None
 
-        Return: String of waveform data from the instrument.
+        Return: numpy array of the spectrum data from the instrument.
         """
-        self.ask("SPEC:WAV:SPEC:DATA?")
+        self._set_real_format()
+        return self._ask_block("SPEC:WAV:SPEC:DATA?")
 
     ######################################################
     # MATHEMATICS
@@ -1401,7 +2224,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"CALC:MATH{index}:SCAL {scale}")
+        self._write_cached(f"CALC:MATH{index}:SCAL", f"{scale}")
 
     def getMathScale(self, index=1):
         """
@@ -1425,8 +2248,8 @@ class RTM3004:
 
         Return: None
         """
-        self.write(
-            f'CALC:MATH{waveform}:EXPR:DEF "SUB(CH{channel_one},CH{channel_two}) in V"'
+        self._write_cached(
+            f"CALC:MATH{waveform}:EXPR:DEF", f'"SUB(CH{channel_one},CH{channel_two}) in V"'
         )
 
     def addChannels(self, channel_one=1, channel_two=2, waveform=1):
@@ -1440,8 +2263,8 @@ class RTM3004:
 
         Return: None
         """
-        self.write(
-            f'CALC:MATH{waveform}:EXPR:DEF "ADD(CH{channel_one},CH{channel_two}) in V"'
+        self._write_cached(
+            f"CALC:MATH{waveform}:EXPR:DEF", f'"ADD(CH{channel_one},CH{channel_two}) in V"'
         )
 
     def filterLP(self, waveform=1, ref="M1", freq=10e4):
@@ -1455,7 +2278,7 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f'CALC:MATH{waveform}:EXPR:DEF "LP({ref},{freq})"')
+        self._write_cached(f"CALC:MATH{waveform}:EXPR:DEF", f'"LP({ref},{freq})"')
 
     def enableMath(self, index=1):
         """
@@ -1466,31 +2289,42 @@ class RTM3004:
 
         Return: None
         """
-        self.write(f"CALC:MATH{index}:STAT ON")
+        self._write_cached(f"CALC:MATH{index}:STAT", "ON")
 
     ######################################################
     # CUSTOM SEQUENCES
     ######################################################
 
-    def simpleSetup(self, burst=True, trig=0):
+    def simpleSetup(self, burst=True, trig=0, slot=None):
         """
-        Custom sequence created for quick and easy data taking. The prepares the first two channels of the oscilloscope, an edge trigger and generating waveform. The trigger here is set to be on channel 2 and the waveform generator is set to the default values in the simpleWaveform method.
+        Custom sequence created for quick and easy data taking. The prepares the first two channels of the oscilloscope, an edge trigger and generating waveform. The trigger here is set to be on channel 2 and the waveform generator is set to the default values in the simpleWaveform method. \\
+        With a slot, the resulting configuration is also stored in that instrument setup register ("*SAV"), overwriting what it held. Calling simpleSetup again with the same arguments, \\
+        while nothing else was written in between, then recalls it with a single "*RCL".
 
         Args:
             burst: Boolean which sets the burst functionality of the generating waveform.
             trig: Float which sets the trigger level.
+            slot: Int of the instrument setup register used to store and recall the configuration, or None to leave the setup registers untouched.
 
         Return: None
         """
-        channels = [1, 2]
-        for channel in channels:
-            self.toggleChannel(channel=channel, status="ON")
-            if channel == 2:
-                self.setChanCoupling(channel=channel, coup="DCLimit")
+        key = (burst, trig, slot)
+        self._in_setup = slot is not None
+        try:
+            if slot is not None and self._saved_setup == key:
+                self.write(f"*RCL {slot}")
+                self._cache = dict(self._saved_cache)
             else:
-                self.setChanCoupling(channel=channel, coup="ACLimit")
-        self.simpleEdgeTrigger(level=trig)
-        self.simpleWaveform(cycles=100, burst=burst)
+                with self.batch(sync=True):
+                    self.configureChannels([(1, "ACLimit"), (2, "DCLimit")])
+                    self.simpleEdgeTrigger(level=trig)
+                    self.simpleWaveform(cycles=100, burst=burst)
+                if slot is not None:
+                    self.write(f"*SAV {slot}")
+                    self._saved_setup = key
+                    self._saved_cache = dict(self._cache)
+        finally:
+            self._in_setup = False
         self.SimpleSetupStatus = True
 
     def simpleEdgeTrigger(self, channel=2, level=0, coupl="DC", mode="RISE"):
@@ -1505,12 +2339,13 @@ class RTM3004:
 
         Return: None
         """
-        self.setTriggerMode("A", "NORM")
-        self.setTriggerType("A", "EDGE")
-        self.setTriggerSource("A", channel)
-        self.setTriggerEdgeCoupling("A", coupl)
-        self.setTriggerEdgeSlope("A", mode)
-        self.setTriggerEdgeLevel(channel, level)
+        with self.batch():
+            self.setTriggerMode("A", "NORM")
+            self.setTriggerType("A", "EDGE")
+            self.setTriggerSource("A", channel)
+            self.setTriggerEdgeCoupling("A", coupl)
+            self.setTriggerEdgeSlope("A", mode)
+            self.setTriggerEdgeLevel(channel, level)
 
     def simpleWaveform(
         self,
@@ -1538,14 +2373,15 @@ class RTM3004:
 
         Return: None
         """
-        self.toggleWaveform("ON")
-        self.setWaveInfo(fun, amp, offset, freq)
-        self.setVerticalScale(channel=channel, div=amp / 3)
-        self.setVerticalOffset(channel=channel, offset=0)
-        if burst:
-            self.toggleWaveformBurst("ON")
-            self.setWaveformBurstCount(cycles)
-            self.setWaveformBurstIdle(delay)
+        with self.batch():
+            self.toggleWaveform("ON")
+            self.setWaveInfo(fun, amp, offset, freq)
+            self.setVerticalScale(channel=channel, div=amp / 3)
+            self.setVerticalOffset(channel=channel, offset=0)
+            if burst:
+                self.toggleWaveformBurst("ON")
+                self.setWaveformBurstCount(cycles)
+                self.setWaveformBurstIdle(delay)
 
     def setSimpleMeasurements(self):
         """
@@ -1562,20 +2398,12 @@ class RTM3004:
 
         Return: None
         """
-        self.setMeasurementSource(index=1, channel=1)
-        self.setMeasurementSource(index=2, channel=1)
-        self.setMeasurementSource(index=3, channel=1)
-        self.setMeasurementSource(index=4, channel=1)
-        self.setMeasurementSource(index=5, channel=2)
-        self.setMeasurementSource(index=6, channel=2)
-        self.setMeasurementSource(index=7, channel=2)
-        self.setMeasurementSource(index=8, channel=2)
-        self.setMeasurement(index=1, mode="PEAK")
-        self.setMeasurement(index=5, mode="PEAK")
-        self.setMeasurement(index=2, mode="FREQ")
-        self.setMeasurement(index=6, mode="FREQ")
-        self.setMeasurement(index=3, mode="MEAN")
-        self.setMeasurement(index=7, mode="MEAN")
+        with self.batch(sync=True):
+            for i in range(1, 9):
+                self.setMeasurementSource(index=i, channel=1 if i <= 4 else 2)
+            for n, mode in enumerate(("PEAK", "FREQ", "MEAN"), 1):
+                for i in (n, n + 4):
+                    self.setMeasurement(index=i, mode=mode)
         self.SimpleMeasurementStatus = True
 
     def getSimpleMeasurements(self):
@@ -1590,29 +2418,22 @@ class RTM3004:
         Args:
             None
 
-        Return: List of measurements in the order [peak_ch1, peak_ch2, freq_ch1, freq_ch2, mean_ch1, mean_ch2].
+        Return: numpy array of measurements in the order [peak_ch1, peak_ch2, freq_ch1, freq_ch2, mean_ch1, mean_ch2].
         """
-        peak1 = self.getMeasurementResult(index=1)
-        peak2 = self.getMeasurementResult(index=5)
-        freq1 = self.getMeasurementResult(index=2)
-        freq2 = self.getMeasurementResult(index=6)
-        mean1 = self.getMeasurementResult(index=3)
-        mean2 = self.getMeasurementResult(index=7)
-        return [peak1[:-1], peak2[:-1], freq1[:-1], freq2[:-1], mean1[:-1], mean2[:-1]]
+        return self._batch_ask_floats(*self._Q_SIMPLE_RES)
 
     def getMeasurements(self, measures=8):
         """
-        Returns some number of measurement slots as a list regardless of the current settings.
+        Returns some number of measurement slots as an array regardless of the current settings.
 
         Args:
             measures: Int which determines the number of measurements to return. In the range [1..8].
 
-        Return: List of measurements.
+        Return: numpy array of measurements, in the order of the indices.
         """
-        data = []
-        for i in range(measures):
-            data.append(self.getMeasurementResult(index=i + 1)[:-1])
-        return data
+        if not 1 <= measures <= len(self._Q_MEAS_RES):
+            raise ValueError(f"measures must be in the range [1..{len(self._Q_MEAS_RES)}], got {measures}.")
+        return self._batch_ask_floats(*self._Q_MEAS_RES[:measures])
 
     def getSimpleMean(self):
         """
@@ -1621,15 +2442,9 @@ class RTM3004:
         Args:
             None
 
-        Return: List of measurements.
+        Return: numpy array of measurements, in the same order as "getSimpleMeasurements".
         """
-        peak1 = self.getMeasurementAvg(index=1)
-        peak2 = self.getMeasurementAvg(index=5)
-        freq1 = self.getMeasurementAvg(index=2)
-        freq2 = self.getMeasurementAvg(index=6)
-        mean1 = self.getMeasurementAvg(index=3)
-        mean2 = self.getMeasurementAvg(index=7)
-        return [peak1[:-1], peak2[:-1], freq1[:-1], freq2[:-1], mean1[:-1], mean2[:-1]]
+        return self._batch_ask_floats(*self._Q_SIMPLE_AVG)
 
     def getSimpleSTD(self):
         """
@@ -1638,15 +2453,9 @@ class RTM3004:
         Args:
             None
 
-        Return: List of measurement standard deviations.
+        Return: numpy array of measurement standard deviations, in the same order as "getSimpleMeasurements".
         """
-        peak1 = self.getMeasurementStd(index=1)
-        peak2 = self.getMeasurementStd(index=5)
-        freq1 = self.getMeasurementStd(index=2)
-        freq2 = self.getMeasurementStd(index=6)
-        mean1 = self.getMeasurementStd(index=3)
-        mean2 = self.getMeasurementStd(index=7)
-        return [peak1[:-1], peak2[:-1], freq1[:-1], freq2[:-1], mean1[:-1], mean2[:-1]]
+        return self._batch_ask_floats(*self._Q_SIMPLE_STD)
 
     def setSimpleScale(self):
         """
@@ -1658,7 +2467,7 @@ class RTM3004:
         Return: Int of 1 when complete.
         """
         if not self.SimpleSetupStatus:
-            print("simpleSetup is not set and simple scaling can't be done.")
+            log.warning("simpleSetup is not set and simple scaling can't be done.")
             return 0
         amp_scale = self.wavevolt
         self.fixClipping(index=5, channel=2, scale=amp_scale / 2)
@@ -1674,6 +2483,4 @@ class RTM3004:
 
         Return: None
         """
-        for i in range(8):
-            ch = i + 1
-            self.resetMeasurementStats(ch=ch)
+        self._batch_write(*(f"MEAS{i}:STAT:RES" for i in range(1, 9)))